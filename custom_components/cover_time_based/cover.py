@@ -2,17 +2,16 @@
 
 import logging
 
-from datetime import timedelta
+from types import MappingProxyType
 
 import voluptuous as vol
 
-from xknx.devices import TravelStatus
+from xknx.devices import TravelCalculator, TravelStatus
 
 from homeassistant.core import callback
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.event import (
     async_track_utc_time_change,
-    async_track_time_interval,
 )
 from homeassistant.components.cover import (
     ATTR_CURRENT_POSITION,
@@ -45,6 +44,7 @@ CONF_TRAVELLING_TIME_UP = "travelling_time_up"
 CONF_TILTING_TIME_DOWN = "tilting_time_down"
 CONF_TILTING_TIME_UP = "tilting_time_up"
 DEFAULT_TRAVEL_TIME = 30
+AUTO_UPDATE_INTERVAL = 1.0
 
 CONF_OPEN_SWITCH_ENTITY_ID = "open_switch_entity_id"
 CONF_CLOSE_SWITCH_ENTITY_ID = "close_switch_entity_id"
@@ -157,12 +157,13 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         stop_switch_entity_id,
     ):
         """Initialize the cover."""
-        from xknx.devices import TravelCalculator
-
         self._travel_time_down = travel_time_down
         self._travel_time_up = travel_time_up
         self._tilting_time_down = tilt_time_down
         self._tilting_time_up = tilt_time_up
+        self._has_tilt = (
+            self._tilting_time_down is not None and self._tilting_time_up is not None
+        )
         self._open_switch_entity_id = open_switch_entity_id
         self._close_switch_entity_id = close_switch_entity_id
         self._stop_switch_entity_id = stop_switch_entity_id
@@ -173,50 +174,99 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         else:
             self._name = device_id
 
-        self._unsubscribe_auto_updater = None
+        attr = {}
+        if self._travel_time_down is not None:
+            attr[CONF_TRAVELLING_TIME_DOWN] = self._travel_time_down
+        if self._travel_time_up is not None:
+            attr[CONF_TRAVELLING_TIME_UP] = self._travel_time_up
+        if self._tilting_time_down is not None:
+            attr[CONF_TILTING_TIME_DOWN] = self._tilting_time_down
+        if self._tilting_time_up is not None:
+            attr[CONF_TILTING_TIME_UP] = self._tilting_time_up
+        self._extra_state_attributes = MappingProxyType(attr)
+
+        self._auto_updater_handle = None
+        self._last_written_position = None
+        self._state_write_scheduled = False
+        self._motion_directions = None
+
+        # command -> (log label, resulting state, relay sender)
+        self._command_dispatch = {
+            SERVICE_CLOSE_COVER: ("DOWN", False, self._send_close),
+            SERVICE_OPEN_COVER: ("UP", True, self._send_open),
+            SERVICE_STOP_COVER: ("STOP", True, self._send_stop),
+        }
 
         self.travel_calc = TravelCalculator(
             self._travel_time_down,
             self._travel_time_up,
         )
-        if self._has_tilt_support():
+        if self._has_tilt:
             self.tilt_calc = TravelCalculator(
                 self._tilting_time_down,
                 self._tilting_time_up,
             )
 
+        # The calculators always report a position, so setting it is always
+        # supported.
+        supported_features = (
+            CoverEntityFeature.OPEN
+            | CoverEntityFeature.CLOSE
+            | CoverEntityFeature.STOP
+            | CoverEntityFeature.SET_POSITION
+        )
+        if self._has_tilt:
+            supported_features |= (
+                CoverEntityFeature.OPEN_TILT
+                | CoverEntityFeature.CLOSE_TILT
+                | CoverEntityFeature.STOP_TILT
+                | CoverEntityFeature.SET_TILT_POSITION
+            )
+        self._attr_supported_features = supported_features
+
     async def async_added_to_hass(self):
         """Only cover's position and tilt matters."""
         old_state = await self.async_get_last_state()
         _LOGGER.debug("async_added_to_hass :: oldState %s", old_state)
-        if (
-            old_state is not None
-            and self.travel_calc is not None
-            and old_state.attributes.get(ATTR_CURRENT_POSITION) is not None
-        ):
-            self.travel_calc.set_position(
-                int(old_state.attributes.get(ATTR_CURRENT_POSITION))
-            )
+        if old_state is None:
+            return
 
-            if (
-                self._has_tilt_support()
-                and old_state.attributes.get(ATTR_CURRENT_TILT_POSITION) is not None
-            ):
-                self.tilt_calc.set_position(
-                    int(old_state.attributes.get(ATTR_CURRENT_TILT_POSITION))
-                )
+        attributes = old_state.attributes
+        position = attributes.get(ATTR_CURRENT_POSITION)
+        if position is not None:
+            self.travel_calc.set_position(int(position))
 
+        if self._has_tilt:
+            tilt_position = attributes.get(ATTR_CURRENT_TILT_POSITION)
+            if tilt_position is not None:
+                self.tilt_calc.set_position(int(tilt_position))
+
+    @callback
     def _handle_stop(self):
         """Handle stop"""
-        if self.travel_calc.is_traveling():
+        travel_moving = self.travel_calc.is_traveling()
+        tilt_moving = self._has_tilt and self.tilt_calc.is_traveling()
+        if not (travel_moving or tilt_moving):
+            return
+
+        if travel_moving:
             _LOGGER.debug("_handle_stop :: button stops cover movement")
             self.travel_calc.stop()
-            self.stop_auto_updater()
 
-        if self._has_tilt_support() and self.tilt_calc.is_traveling():
+        if tilt_moving:
             _LOGGER.debug("_handle_stop :: button stops tilt movement")
             self.tilt_calc.stop()
-            self.stop_auto_updater()
+
+        self.stop_auto_updater()
+
+    async def _async_stop_now(self):
+        """Send the stop command, stopping any running movement first.
+
+        The state write is deferred, so it sees changes the caller makes
+        right after this returns.
+        """
+        self._handle_stop()
+        await self._async_handle_command(SERVICE_STOP_COVER)
 
     @property
     def name(self):
@@ -236,16 +286,7 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
     @property
     def extra_state_attributes(self):
         """Return the device state attributes."""
-        attr = {}
-        if self._travel_time_down is not None:
-            attr[CONF_TRAVELLING_TIME_DOWN] = self._travel_time_down
-        if self._travel_time_up is not None:
-            attr[CONF_TRAVELLING_TIME_UP] = self._travel_time_up
-        if self._tilting_time_down is not None:
-            attr[CONF_TILTING_TIME_DOWN] = self._tilting_time_down
-        if self._tilting_time_up is not None:
-            attr[CONF_TILTING_TIME_UP] = self._tilting_time_up
-        return attr
+        return self._extra_state_attributes
 
     @property
     def current_cover_position(self) -> int | None:
@@ -255,35 +296,19 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
     @property
     def current_cover_tilt_position(self) -> int | None:
         """Return the current tilt of the cover."""
-        if self._has_tilt_support():
+        if self._has_tilt:
             return self.tilt_calc.current_position()
         return None
 
     @property
     def is_opening(self):
         """Return if the cover is opening or not."""
-        return (
-            self.travel_calc.is_traveling()
-            and self.travel_calc.travel_direction == TravelStatus.DIRECTION_UP
-        ) or (
-            self._has_tilt_support()
-            and self.tilt_calc.is_traveling()
-            and self.tilt_calc.travel_direction == TravelStatus.DIRECTION_UP
-        )
+        return TravelStatus.DIRECTION_UP in self._moving_directions()
 
     @property
     def is_closing(self):
         """Return if the cover is closing or not."""
-        from xknx.devices import TravelStatus
-
-        return (
-            self.travel_calc.is_traveling()
-            and self.travel_calc.travel_direction == TravelStatus.DIRECTION_DOWN
-        ) or (
-            self._has_tilt_support()
-            and self.tilt_calc.is_traveling()
-            and self.tilt_calc.travel_direction == TravelStatus.DIRECTION_DOWN
-        )
+        return TravelStatus.DIRECTION_DOWN in self._moving_directions()
 
     @property
     def is_closed(self):
@@ -295,26 +320,6 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         """Return True because covers can be stopped midway."""
         return True
 
-    @property
-    def supported_features(self) -> CoverEntityFeature:
-        """Flag supported features."""
-        supported_features = (
-            CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE | CoverEntityFeature.STOP
-        )
-        if self.current_cover_position is not None:
-            supported_features |= CoverEntityFeature.SET_POSITION
-
-        if self._has_tilt_support():
-            supported_features |= (
-                CoverEntityFeature.OPEN_TILT
-                | CoverEntityFeature.CLOSE_TILT
-                | CoverEntityFeature.STOP_TILT
-            )
-            if self.current_cover_tilt_position is not None:
-                supported_features |= CoverEntityFeature.SET_TILT_POSITION
-
-        return supported_features
-
     async def async_set_cover_position(self, **kwargs):
         """Move the cover to a specific position."""
         if ATTR_POSITION in kwargs:
@@ -334,8 +339,8 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         _LOGGER.debug("async_close_cover")
         if self.travel_calc.current_position() > 0:
             self.travel_calc.start_travel_down()
-            self.start_auto_updater()
             self._update_tilt_before_travel(SERVICE_CLOSE_COVER)
+            self.start_auto_updater()
             await self._async_handle_command(SERVICE_CLOSE_COVER)
 
     async def async_open_cover(self, **kwargs):
@@ -343,8 +348,8 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         _LOGGER.debug("async_open_cover")
         if self.travel_calc.current_position() < 100:
             self.travel_calc.start_travel_up()
-            self.start_auto_updater()
             self._update_tilt_before_travel(SERVICE_OPEN_COVER)
+            self.start_auto_updater()
             await self._async_handle_command(SERVICE_OPEN_COVER)
 
     async def async_close_cover_tilt(self, **kwargs):
@@ -372,87 +377,128 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
     async def set_position(self, position):
         """Move cover to a designated position."""
         _LOGGER.debug("set_position")
-        current_position = self.travel_calc.current_position()
-        _LOGGER.debug(
-            "set_position :: current_position: %d, new_position: %d",
-            current_position,
-            position,
-        )
-        command = None
-        if position < current_position:
-            command = SERVICE_CLOSE_COVER
-        elif position > current_position:
-            command = SERVICE_OPEN_COVER
+        command = self._start_travel(self.travel_calc, position)
         if command is not None:
-            self.start_auto_updater()
-            self.travel_calc.start_travel(position)
-            _LOGGER.debug("set_position :: command %s", command)
             self._update_tilt_before_travel(command)
+            self.start_auto_updater()
             await self._async_handle_command(command)
-        return
 
     async def set_tilt_position(self, position):
         """Move cover tilt to a designated position."""
         _LOGGER.debug("set_tilt_position")
-        current_position = self.tilt_calc.current_position()
+        command = self._start_travel(self.tilt_calc, position)
+        if command is not None:
+            self.start_auto_updater()
+            await self._async_handle_command(command)
+
+    def _start_travel(self, calc, position):
+        """Start moving a calculator to position and return the command."""
+        current_position = calc.current_position()
         _LOGGER.debug(
-            "set_tilt_position :: current_position: %d, new_position: %d",
+            "_start_travel :: current_position: %d, new_position: %d",
             current_position,
             position,
         )
-        command = None
         if position < current_position:
             command = SERVICE_CLOSE_COVER
         elif position > current_position:
             command = SERVICE_OPEN_COVER
-        if command is not None:
-            self.start_auto_updater()
-            self.tilt_calc.start_travel(position)
-            _LOGGER.debug("set_tilt_position :: command %s", command)
-            await self._async_handle_command(command)
-        return
+        else:
+            return None
+        calc.start_travel(position)
+        _LOGGER.debug("_start_travel :: command %s", command)
+        return command
 
     def start_auto_updater(self):
         """Start the autoupdater to update HASS while cover is moving."""
         _LOGGER.debug("start_auto_updater")
-        if self._unsubscribe_auto_updater is None:
-            _LOGGER.debug("init _unsubscribe_auto_updater")
-            interval = timedelta(seconds=0.1)
-            self._unsubscribe_auto_updater = async_track_time_interval(
-                self.hass, self.auto_updater_hook, interval
+        # A new movement may arrive before the pending tick, so always re-arm
+        self.stop_auto_updater()
+        self._last_written_position = None
+        self._schedule_auto_updater()
+
+    def _schedule_auto_updater(self):
+        """Schedule the next autoupdater tick."""
+        self._auto_updater_handle = self.hass.loop.call_later(
+            self._auto_updater_interval(), self.auto_updater_hook
+        )
+
+    def _auto_updater_interval(self):
+        """Return the delay until the next autoupdater tick.
+
+        The stop is sent from the tick that lands on the arrival of the
+        movement; the ticks before it only refresh the reported position.
+        """
+        calcs = [self.travel_calc]
+        if self._has_tilt:
+            calcs.append(self.tilt_calc)
+        remaining = 0
+        for calc in calcs:
+            if not calc.is_traveling():
+                continue
+            distance = calc.travel_to_position - calc.last_known_position
+            travel_time = calc.travel_time_up if distance > 0 else calc.travel_time_down
+            remaining = max(
+                remaining,
+                calc.travel_started_time
+                + travel_time * abs(distance) / 100
+                - calc.current_time(),
             )
+        return min(AUTO_UPDATE_INTERVAL, remaining)
 
     @callback
-    def auto_updater_hook(self, now):
+    def auto_updater_hook(self):
         """Call for the autoupdater."""
-        _LOGGER.debug("auto_updater_hook")
-        self.async_schedule_update_ha_state()
         if self.position_reached():
+            # The stop command writes the final state
             _LOGGER.debug("auto_updater_hook :: position_reached")
             self.stop_auto_updater()
-        self.hass.async_create_task(self.auto_stop_if_necessary())
+            self.hass.async_create_task(self.auto_stop_if_necessary())
+            return
+        position = (self.current_cover_position, self.current_cover_tilt_position)
+        if position != self._last_written_position:
+            self._last_written_position = position
+            self._schedule_state_write()
+        self._schedule_auto_updater()
 
+    @callback
     def stop_auto_updater(self):
         """Stop the autoupdater."""
         _LOGGER.debug("stop_auto_updater")
-        if self._unsubscribe_auto_updater is not None:
-            self._unsubscribe_auto_updater()
-            self._unsubscribe_auto_updater = None
+        handle = self._auto_updater_handle
+        if handle is not None:
+            self._auto_updater_handle = None
+            handle.cancel()
 
     def position_reached(self):
         """Return if cover has reached its final position."""
         return self.travel_calc.position_reached() and (
-            not self._has_tilt_support() or self.tilt_calc.position_reached()
+            not self._has_tilt or self.tilt_calc.position_reached()
         )
 
-    def _has_tilt_support(self):
-        """Return if cover has tilt support."""
+    def _moving_directions(self):
+        """Return the directions the cover and its tilt are moving in."""
+        if self._motion_directions is not None:
+            return self._motion_directions
+        directions = []
+        if self.travel_calc.is_traveling():
+            directions.append(self.travel_calc.travel_direction)
+        if self._has_tilt and self.tilt_calc.is_traveling():
+            directions.append(self.tilt_calc.travel_direction)
+        return directions
 
-        return self._tilting_time_down is not None and self._tilting_time_up is not None
+    @callback
+    def async_write_ha_state(self):
+        """Write the state, reading the motion directions only once."""
+        self._motion_directions = self._moving_directions()
+        try:
+            super().async_write_ha_state()
+        finally:
+            self._motion_directions = None
 
     def _update_tilt_before_travel(self, command):
         """Updating tilt before travel."""
-        if self._has_tilt_support():
+        if self._has_tilt:
             _LOGGER.debug("_update_tilt_before_travel :: command %s", command)
             if command == SERVICE_OPEN_COVER:
                 self.tilt_calc.set_position(100)
@@ -464,94 +510,107 @@ class CoverTimeBased(CoverEntity, RestoreEntity):
         if self.position_reached():
             _LOGGER.debug("auto_stop_if_necessary :: calling stop command")
             self.travel_calc.stop()
-            if self._has_tilt_support():
+            if self._has_tilt:
                 self.tilt_calc.stop()
             await self._async_handle_command(SERVICE_STOP_COVER)
 
     async def set_known_position(self, **kwargs):
         """We want to do a few things when we get a position"""
         position = kwargs[ATTR_POSITION]
-        self._handle_stop()
-        await self._async_handle_command(SERVICE_STOP_COVER)
+        await self._async_stop_now()
         self.travel_calc.set_position(position)
 
     async def set_known_tilt_position(self, **kwargs):
         """We want to do a few things when we get a position"""
         position = kwargs[ATTR_TILT_POSITION]
-        await self._async_handle_command(SERVICE_STOP_COVER)
+        await self._async_stop_now()
         self.tilt_calc.set_position(position)
 
-    async def _async_handle_command(self, command, *args):
-        if command == SERVICE_CLOSE_COVER:
-            cmd = "DOWN"
-            self._state = False
+    async def _send_close(self):
+        """Switch the relays to close the cover."""
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_off",
+            {"entity_id": self._open_switch_entity_id},
+            False,
+        )
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_on",
+            {"entity_id": self._close_switch_entity_id},
+            False,
+        )
+        if self._stop_switch_entity_id is not None:
             await self.hass.services.async_call(
                 "homeassistant",
                 "turn_off",
-                {"entity_id": self._open_switch_entity_id},
+                {"entity_id": self._stop_switch_entity_id},
                 False,
             )
-            await self.hass.services.async_call(
-                "homeassistant",
-                "turn_on",
-                {"entity_id": self._close_switch_entity_id},
-                False,
-            )
-            if self._stop_switch_entity_id is not None:
-                await self.hass.services.async_call(
-                    "homeassistant",
-                    "turn_off",
-                    {"entity_id": self._stop_switch_entity_id},
-                    False,
-                )
-
-        elif command == SERVICE_OPEN_COVER:
-            cmd = "UP"
-            self._state = True
+
+    async def _send_open(self):
+        """Switch the relays to open the cover."""
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_off",
+            {"entity_id": self._close_switch_entity_id},
+            False,
+        )
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_on",
+            {"entity_id": self._open_switch_entity_id},
+            False,
+        )
+        if self._stop_switch_entity_id is not None:
             await self.hass.services.async_call(
                 "homeassistant",
                 "turn_off",
-                {"entity_id": self._close_switch_entity_id},
+                {"entity_id": self._stop_switch_entity_id},
                 False,
             )
+
+    async def _send_stop(self):
+        """Switch the relays to stop the cover."""
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_off",
+            {"entity_id": self._close_switch_entity_id},
+            False,
+        )
+        await self.hass.services.async_call(
+            "homeassistant",
+            "turn_off",
+            {"entity_id": self._open_switch_entity_id},
+            False,
+        )
+        if self._stop_switch_entity_id is not None:
             await self.hass.services.async_call(
                 "homeassistant",
                 "turn_on",
-                {"entity_id": self._open_switch_entity_id},
-                False,
-            )
-            if self._stop_switch_entity_id is not None:
-                await self.hass.services.async_call(
-                    "homeassistant",
-                    "turn_off",
-                    {"entity_id": self._stop_switch_entity_id},
-                    False,
-                )
-
-        elif command == SERVICE_STOP_COVER:
-            cmd = "STOP"
-            self._state = True
-            await self.hass.services.async_call(
-                "homeassistant",
-                "turn_off",
-                {"entity_id": self._close_switch_entity_id},
-                False,
-            )
-            await self.hass.services.async_call(
-                "homeassistant",
-                "turn_off",
-                {"entity_id": self._open_switch_entity_id},
+                {"entity_id": self._stop_switch_entity_id},
                 False,
             )
-            if self._stop_switch_entity_id is not None:
-                await self.hass.services.async_call(
-                    "homeassistant",
-                    "turn_on",
-                    {"entity_id": self._stop_switch_entity_id},
-                    False,
-                )
+
+    async def _async_handle_command(self, command, *args):
+        cmd, self._state, send = self._command_dispatch[command]
+        await send()
 
         _LOGGER.debug("_async_handle_command :: %s", cmd)
 
         # Update state of entity
+        self._schedule_state_write()
+
+    @callback
+    def _schedule_state_write(self):
+        """Coalesce state writes requested within one loop iteration."""
+        if self._state_write_scheduled:
+            return
+        self._state_write_scheduled = True
+        self.hass.loop.call_soon(self._write_scheduled_state)
+
+    @callback
+    def _write_scheduled_state(self):
+        """Write the state requested by _schedule_state_write."""
+        self._state_write_scheduled = False
         self.async_write_ha_state()